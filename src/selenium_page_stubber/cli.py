@@ -1,13 +1,18 @@
+import logging
 import os
 import os.path
 import pathlib
 import tempfile
+from typing import Iterable, Optional
 
 
 import click
 import click.exceptions
+import requests
+import selenium.webdriver.chrome.webdriver
 
 
+import selenium_page_stubber.client.cluster
 import selenium_page_stubber.client.lib
 import selenium_page_stubber.user
 
@@ -71,17 +76,76 @@ def main(
     page = new_page_class(driver=driver, url=site)  # noqa: F841
 
 
+def main_page_types(
+        sites: Iterable[str],
+        page_directory: pathlib.Path,
+        template_directory: pathlib.Path,
+        template_name: str,
+        samples_per_cluster: int = 3) -> dict[str, type]:
+    """Get one page class per page type in sites, only loading a sample of
+    each type in the browser, and return a mapping of every site to its page
+    class.  Like main, classes come from get_page_class: one already in
+    page_directory is used, otherwise one is created in memory, and nothing
+    is written to page_directory.  Samples that can't be loaded are logged
+    and skipped."""
+    # One browser is shared by every sample, and quit when we're done
+    drivers: list[selenium.webdriver.chrome.webdriver.WebDriver] = []
+
+    def get_shape(site: str) -> Optional[str]:
+        try:
+            if drivers:
+                selenium_page_stubber.client.lib.check_site(site)
+                drivers[0].get(site)
+            else:
+                drivers.append(
+                    selenium_page_stubber.client.lib.get_driver(site))
+        except requests.RequestException as exc:
+            logging.error("Skipping %s: %s", site, exc)
+            return None
+        return selenium_page_stubber.client.cluster.dom_shape_hash(
+            drivers[0].page_source)
+
+    page_classes: dict[str, type] = {}
+    try:
+        for page_type in selenium_page_stubber.client.cluster.cluster_pages(
+                sites, get_shape, samples_per_cluster):
+            new_page_class = selenium_page_stubber.client.lib.get_page_class(
+                page_directory=page_directory,
+                page_module=page_type.class_name,
+                page_class=page_type.class_name,
+                template_directory=template_directory,
+                template_name=template_name)
+            if page_type.samples:
+                site = page_type.samples[0]
+                driver = drivers[0]
+                if driver.current_url != site:
+                    driver.get(site)
+                page = new_page_class(driver=driver, url=site)  # noqa: F841
+            page_classes.update(
+                dict.fromkeys(page_type.members, new_page_class))
+    finally:
+        for driver in drivers:
+            driver.quit()
+    return page_classes
+
+
 @click.command
 @click.option(
     "initialize", "--initialize", is_flag=True,
     envvar="INITIALIZE",
     help="Initialize pages and templates directory before creating pages")
-@click.argument("site")
+@click.option(
+    "samples", "--samples", type=click.IntRange(min=1), default=3,
+    envvar="SAMPLES", show_default=True,
+    help="Number of pages of each page type to load, when given several sites")
+@click.argument("sites", nargs=-1, required=True)
 @click.pass_context
 def cli(ctx: click.Context,
         initialize: bool,
-        site: str) -> None:
-    """Create the stub Selenium page."""
+        samples: int,
+        sites: tuple[str, ...]) -> None:
+    """Create the stub Selenium pages.  When given several sites, they are
+    grouped into page types, and one page is created for each type."""
     pages_dir = pathlib.Path("pages")
     base_page_name = "Page"
     base_page_module_name = "Page"
@@ -102,10 +166,18 @@ def cli(ctx: click.Context,
         click.echo(str(exc))
         raise
 
-    main(
-        site,
-        pages_dir,
-        templates_dir,
-        base_template_file,
-        base_page_name,
-        base_page_module_name)
+    if len(sites) == 1:
+        main(
+            sites[0],
+            pages_dir,
+            templates_dir,
+            base_template_file,
+            base_page_name,
+            base_page_module_name)
+    else:
+        main_page_types(
+            sites,
+            pages_dir,
+            templates_dir,
+            base_template_file,
+            samples)
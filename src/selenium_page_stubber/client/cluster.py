@@ -0,0 +1,352 @@
+import collections
+import hashlib
+import html.parser
+import itertools
+import logging
+import re
+import urllib.parse
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+
+PLACEHOLDER = "{}"
+ID_SEGMENTS = (
+    re.compile(r"\d+"),
+    re.compile(
+        r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}",
+        re.IGNORECASE),
+    re.compile(r"(?=[a-z]*\d)[0-9a-f]{8,}", re.IGNORECASE),
+)
+# Elements that never have an end tag, so never have children
+VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr"})
+# Elements whose end tag can be left out, and the elements that close them
+# when they start, unless an element in SCOPE_ELEMENTS is open between them
+OPTIONAL_END_ELEMENTS = {
+    "dd": frozenset({"dd", "dt"}),
+    "dt": frozenset({"dd", "dt"}),
+    "li": frozenset({"li"}),
+    "option": frozenset({"option"}),
+    "p": frozenset({"p"}),
+    "td": frozenset({"td", "th"}),
+    "th": frozenset({"td", "th"}),
+    "tr": frozenset({"tr"}),
+}
+SCOPE_ELEMENTS = frozenset({
+    "datalist", "dl", "menu", "ol", "select", "table", "ul"})
+
+
+def _is_identifier(value: str) -> bool:
+    return any(pattern.fullmatch(value) for pattern in ID_SEGMENTS)
+
+
+def url_template(url: str) -> str:
+    """Return the template for url, with the path segments and query values
+    that look like identifiers replaced by placeholders, so that /product/1
+    and /product/50000 share a template, but ?page=about and ?page=contact
+    don't."""
+    parts = urllib.parse.urlsplit(url)
+    segments = []
+    for segment in parts.path.split("/"):
+        stem, dot, extension = segment.partition(".")
+        if _is_identifier(stem):
+            stem = PLACEHOLDER
+        segments.append(f"{stem}{dot}{extension}")
+    path = "/".join(segments) or "/"
+    query = "&".join(sorted({
+        "{}={}".format(
+            urllib.parse.quote(key, safe=""),
+            PLACEHOLDER if _is_identifier(value)
+            else urllib.parse.quote(value, safe=""))
+        for key, value in urllib.parse.parse_qsl(
+            parts.query, keep_blank_values=True)}))
+    return urllib.parse.urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def _template_variants(template: str) -> list[str]:
+    # The template with each segment of its path, then each query value, in
+    # turn replaced by a placeholder
+    parts = urllib.parse.urlsplit(template)
+    segments = parts.path.split("/")
+    variants = []
+    for i, segment in enumerate(segments):
+        stem, dot, extension = segment.partition(".")
+        if stem and stem != PLACEHOLDER:
+            variant = list(segments)
+            variant[i] = f"{PLACEHOLDER}{dot}{extension}"
+            variants.append(urllib.parse.urlunsplit(
+                parts._replace(path="/".join(variant))))
+    parameters = parts.query.split("&") if parts.query else []
+    for i, parameter in enumerate(parameters):
+        key, _, value = parameter.partition("=")
+        if value != PLACEHOLDER:
+            variant = list(parameters)
+            variant[i] = f"{key}={PLACEHOLDER}"
+            variants.append(urllib.parse.urlunsplit(
+                parts._replace(query="&".join(variant))))
+    return variants
+
+
+def collapse_templates(
+        templates: Iterable[str], max_distinct: int) -> dict[str, str]:
+    """Map each of templates to a more general one, so that slugs like
+    /blog/how-to-2024, which url_template can't tell from fixed names, share
+    /blog/{} once more than max_distinct of them differ only in that
+    segment.  Query values are collapsed the same way.  Fixed names, like
+    /about and /contact, can be collapsed too, so the result is only a
+    guess, for cluster_pages to check against the shapes of the pages."""
+    mapping = {template: template for template in templates}
+    while True:
+        by_variant: dict[str, set[str]] = {}
+        for template in set(mapping.values()):
+            for variant in _template_variants(template):
+                by_variant.setdefault(variant, set()).add(template)
+        collapsed = {}
+        for template in set(mapping.values()):
+            variants = [
+                variant for variant in _template_variants(template)
+                if len(by_variant[variant]) > max_distinct]
+            if variants:
+                collapsed[template] = max(
+                    variants, key=lambda variant: len(by_variant[variant]))
+        if not collapsed:
+            return mapping
+        # Collapsing one segment can make another one collapsible, e.g.
+        # /blog/{category}/{post}, so keep going until nothing changes
+        mapping = {
+            template: collapsed.get(general, general)
+            for template, general in mapping.items()}
+
+
+def page_class_name(template: str) -> str:
+    """Return a class name for the pages that share template, built from the
+    parts of its path and query values that aren't placeholders."""
+    parts = urllib.parse.urlsplit(template)
+    names = [segment.partition(".")[0] for segment in parts.path.split("/")]
+    names.extend(
+        urllib.parse.unquote(parameter.partition("=")[2])
+        for parameter in parts.query.split("&"))
+    words = [
+        word.capitalize()
+        for name in names if name != PLACEHOLDER
+        for word in re.split(r"[^0-9a-zA-Z]+", name)
+        if word]
+    name = "".join(words) or "Index"
+    if name[0].isdigit():
+        name = f"Page{name}"
+    return f"{name}Page"
+
+
+class _ShapeParser(html.parser.HTMLParser):
+    """Reduce a document to a hash of its element tree, ignoring text and
+    attributes, and treating runs of identically shaped siblings as one, so
+    that a list of 3 products has the same shape as a list of 30."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.tags: list[str] = []
+        self.children: list[list[str]] = [[]]
+
+    def handle_starttag(
+            self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if tag in VOID_ELEMENTS:
+            self.children[-1].append(self._signature(tag, []))
+        else:
+            if tag in OPTIONAL_END_ELEMENTS:
+                self._close_optional(tag)
+            self.tags.append(tag)
+            self.children.append([])
+
+    def handle_startendtag(
+            self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        self.children[-1].append(self._signature(tag, []))
+
+    def handle_endtag(self, tag: str) -> None:
+        # Close any elements left open inside this one, and ignore end tags
+        # with no matching start tag
+        if tag in self.tags:
+            while self.tags:
+                if self._close() == tag:
+                    break
+
+    def _close_optional(self, tag: str) -> None:
+        # <li>a<li>b means two sibling items, not one nested in the other,
+        # and <td>a<th>b two sibling cells
+        closes = OPTIONAL_END_ELEMENTS[tag]
+        for open_tag in reversed(self.tags):
+            if open_tag in SCOPE_ELEMENTS:
+                return
+            if open_tag in closes:
+                while self._close() != open_tag:
+                    pass
+                return
+
+    def _close(self) -> str:
+        tag = self.tags.pop()
+        children = self.children.pop()
+        self.children[-1].append(self._signature(tag, children))
+        return tag
+
+    @staticmethod
+    def _signature(tag: str, children: list[str]) -> str:
+        collapsed = [child for child, _ in itertools.groupby(children)]
+        return hashlib.blake2b(
+            f"{tag}({','.join(collapsed)})".encode(),
+            digest_size=8).hexdigest()
+
+    def shape(self) -> str:
+        while self.tags:
+            self._close()
+        return self._signature("", self.children[0])
+
+
+def dom_shape_hash(document: str) -> str:
+    """Return a hash of the structure of document.  Pages built from the
+    same template hash the same, whatever their content."""
+    parser = _ShapeParser()
+    parser.feed(document)
+    parser.close()
+    return parser.shape()
+
+
+class PageType(NamedTuple):
+    class_name: str
+    templates: list[str]
+    members: list[str]
+    samples: list[str]
+    shapes: frozenset[str]
+
+
+def _round_robin(groups: Iterable[list[str]]) -> Iterator[str]:
+    # One member of each group in turn, so samples come from every group
+    sentinel = object()
+    for members in itertools.zip_longest(*groups, fillvalue=sentinel):
+        for member in members:
+            if isinstance(member, str):
+                yield member
+
+
+def cluster_pages(
+        urls: Iterable[str],
+        get_shape: Callable[[str], Optional[str]],
+        samples_per_cluster: int = 3,
+        max_distinct_segments: int = 20) -> list[PageType]:
+    """Group urls into page types.  URLs are first grouped by url_template.
+    get_shape is called on only samples_per_cluster of each group, and
+    groups whose samples have the same shape are merged into one page type.
+
+    Templates that collapse_templates would merge, given
+    max_distinct_segments, are sampled together, and are only merged if
+    their samples have the same shape.  A group whose samples still have
+    different shapes is split by shape, with the members that weren't
+    sampled going with the most common one.
+
+    get_shape returns None for a URL that couldn't be loaded, and another
+    member is sampled in its place, up to samples_per_cluster times.  A
+    group none of whose samples could be loaded is its own page type, with
+    no samples or shapes."""
+    if samples_per_cluster <= 0:
+        raise ValueError(
+            "samples_per_cluster must be positive, not "
+            f"{samples_per_cluster}")
+    by_url_template: dict[str, list[str]] = {}
+    for url in urls:
+        by_url_template.setdefault(url_template(url), []).append(url)
+    collapsed = collapse_templates(by_url_template, max_distinct_segments)
+    by_general: dict[str, list[str]] = {}
+    for template, general in collapsed.items():
+        by_general.setdefault(general, []).append(template)
+
+    shapes: dict[str, Optional[str]] = {}
+
+    def sample(members: Iterable[str]) -> dict[str, str]:
+        # Each URL is only loaded once, even if it is sampled again after a
+        # collapse is undone
+        sampled = {}
+        failures = 0
+        for url in members:
+            if url not in shapes:
+                shapes[url] = get_shape(url)
+            url_shape = shapes[url]
+            if url_shape is None:
+                failures += 1
+            else:
+                sampled[url] = url_shape
+            if samples_per_cluster in (len(sampled), failures):
+                break
+        return sampled
+
+    groups: list[tuple[list[str], list[str], dict[str, str]]] = []
+    for general, templates in by_general.items():
+        if len(templates) > 1:
+            sampled = sample(_round_robin(
+                by_url_template[template] for template in templates))
+            if len(set(sampled.values())) == 1:
+                groups.append((
+                    [general],
+                    [url for template in templates
+                     for url in by_url_template[template]],
+                    sampled))
+                continue
+        # Either nothing was collapsed, or the samples show that the
+        # collapsed templates are different kinds of page
+        for template in templates:
+            members = by_url_template[template]
+            groups.append(([template], members, sample(members)))
+
+    # Groups with the same shape are merged, groups that couldn't be loaded
+    # are kept apart by their template
+    by_shape: dict[
+        tuple[Optional[str], str],
+        list[tuple[list[str], list[str], list[str]]]] = {}
+    for templates, members, sampled in groups:
+        if not sampled:
+            logging.warning(
+                "No samples of %s could be loaded", templates[0])
+            by_shape[(None, templates[0])] = [(templates, members, [])]
+            continue
+        counts = collections.Counter(sampled.values())
+        if len(counts) > 1:
+            logging.warning(
+                "Samples of %s have %d different shapes, splitting them",
+                templates[0], len(counts))
+        common = counts.most_common(1)[0][0]
+        for group_shape in counts:
+            if group_shape == common:
+                group_members = [
+                    url for url in members
+                    if sampled.get(url, common) == common]
+            else:
+                group_members = [
+                    url for url, url_shape in sampled.items()
+                    if url_shape == group_shape]
+            by_shape.setdefault((group_shape, ""), []).append((
+                templates,
+                group_members,
+                [url for url in group_members if url in sampled]))
+
+    page_types = []
+    names: set[str] = set()
+    for (type_shape, _), shape_groups in by_shape.items():
+        templates = [
+            template
+            for group_templates, _, _ in shape_groups
+            for template in group_templates]
+        class_name = page_class_name(templates[0])
+        # Different templates can produce the same name, e.g. /a-b and /a/b
+        for suffix in itertools.count(2):
+            if class_name not in names:
+                break
+            class_name = f"{page_class_name(templates[0])[:-4]}{suffix}Page"
+        names.add(class_name)
+        page_types.append(PageType(
+            class_name=class_name,
+            templates=templates,
+            members=[
+                url for _, members, _ in shape_groups for url in members],
+            samples=[
+                url for _, _, samples in shape_groups for url in samples],
+            shapes=frozenset(
+                {type_shape} if type_shape is not None else ())))
+    return page_types
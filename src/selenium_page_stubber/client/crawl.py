@@ -0,0 +1,281 @@
+import hashlib
+import logging
+import math
+import pathlib
+import re
+import string
+import tempfile
+import tracemalloc
+import types
+import urllib.parse
+from typing import IO, Iterable, NamedTuple, Optional, Self
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+UNRESERVED = frozenset(string.ascii_letters + string.digits + "-._~")
+PERCENT_ESCAPE = re.compile(r"%([0-9a-fA-F]{2})")
+
+
+def _normalize_escape(match: re.Match[str]) -> str:
+    # Unreserved characters mean the same escaped or not, so decode them.
+    # Anything else, like %2F, might mean something different decoded, so
+    # only normalize the case of the escape.
+    character = chr(int(match.group(1), 16))
+    if character in UNRESERVED:
+        return character
+    return match.group(0).upper()
+
+
+def _remove_dot_segments(path: str) -> str:
+    # RFC 3986, section 5.2.4: /a/./b/../c is /a/c
+    output: list[str] = []
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+            continue
+        if last:
+            # /a/b/.. is the directory /a/, not the page /a
+            output.append("")
+    return "/".join(output)
+
+
+def _normalize_component(component: str, safe: str) -> str:
+    return PERCENT_ESCAPE.sub(
+        _normalize_escape, urllib.parse.quote(component, safe=f"{safe}%"))
+
+
+def canonicalize_url(
+        url: str, ignored_params: frozenset[str] = frozenset()) -> str:
+    """Return a canonical form of url, so that trivially different spellings
+    of the same page (case of the host, default ports, fragments, order of
+    query parameters) are only visited once.  Raise ValueError if url can't
+    be parsed, e.g. if its port isn't a number."""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        # IPv6 addresses have to stay bracketed to be told from the port
+        host = f"[{host}]"
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo = f"{userinfo}:{parts.password}"
+        host = f"{userinfo}@{host}"
+    path = _remove_dot_segments(_normalize_component(
+        parts.path or "/", safe="/:@!$&'()*+,;=~"))
+    # Parameters are sorted, but otherwise left as they were, so that ?edit
+    # isn't turned into ?edit=, which the server might treat differently
+    query = "&".join(sorted(
+        (_normalize_component(parameter, safe="/:@!$&'()*+,;=~?")
+         for parameter in parts.query.split("&")
+         if parameter and urllib.parse.unquote_plus(
+             parameter.partition("=")[0]) not in ignored_params),
+        key=lambda parameter: parameter.partition("=")[::2]))
+    return urllib.parse.urlunsplit((scheme, host, path, query, ""))
+
+
+class BloomFilter:
+    """A fixed size set of strings that might report false positives, at a
+    rate of no more than false_positive_rate once capacity items are added,
+    but never false negatives."""
+
+    def __init__(
+            self, capacity: int, false_positive_rate: float = 0.01) -> None:
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, not {capacity}")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError(
+                "false_positive_rate must be between 0 and 1, not "
+                f"{false_positive_rate}")
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.size = math.ceil(
+            -capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, item: str) -> Iterable[int]:
+        # Kirsch-Mitzenmacher double hashing: two hashes simulate hash_count
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        """Add item to the filter.  Items that are already in the filter, or
+        are false positives, aren't counted again."""
+        added = False
+        for index in self._indexes(item):
+            mask = 1 << (index & 7)
+            if not self.bits[index >> 3] & mask:
+                self.bits[index >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, str):
+            return False
+        return all(
+            self.bits[index >> 3] & (1 << (index & 7))
+            for index in self._indexes(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class DiskQueue:
+    """A FIFO queue of strings kept in a file, so that only the read offset
+    is held in memory, no matter how many items are waiting.  The queue is
+    not persistent: a file at path is truncated when the queue is created,
+    so it can't be used to resume a crawl.  Items that have been gotten stay
+    in the file until the queue is emptied, then the file is truncated."""
+
+    def __init__(self, path: Optional[pathlib.Path] = None) -> None:
+        self._file: IO[bytes]
+        if path is None:
+            self._file = tempfile.TemporaryFile()
+        else:
+            self._file = path.open("w+b")
+        self._read_offset = 0
+        self._length = 0
+
+    def put(self, item: str) -> None:
+        """Add item to the end of the queue."""
+        if "\n" in item:
+            raise ValueError(f"'{item!r}' contains a newline")
+        self._file.seek(0, 2)
+        self._file.write(item.encode() + b"\n")
+        self._length += 1
+
+    def get(self) -> str:
+        """Remove and return the item at the front of the queue, or raise
+        IndexError if it is empty."""
+        if not self._length:
+            raise IndexError("get from an empty DiskQueue")
+        self._file.seek(self._read_offset)
+        line = self._file.readline()
+        self._read_offset = self._file.tell()
+        self._length -= 1
+        if not self._length:
+            self._file.truncate(0)
+            self._read_offset = 0
+        return line[:-1].decode()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+            self,
+            exc_type: Optional[type[BaseException]],
+            exc: Optional[BaseException],
+            traceback: Optional[types.TracebackType]) -> None:
+        self.close()
+
+
+class Frontier:
+    """The URLs waiting to be crawled.  URLs are canonicalized, and each is
+    only queued the first time it is seen.  capacity should be at least the
+    number of URLs expected, past that more and more new URLs are skipped as
+    false positives, and a warning is logged."""
+
+    def __init__(
+            self,
+            capacity: int,
+            false_positive_rate: float = 0.01,
+            path: Optional[pathlib.Path] = None,
+            ignored_params: frozenset[str] = frozenset()) -> None:
+        self.visited = BloomFilter(capacity, false_positive_rate)
+        self.queue = DiskQueue(path)
+        self.ignored_params = ignored_params
+
+    def add(self, url: str) -> bool:
+        """Queue url, unless it has been seen before.  Return whether it was
+        queued.  URLs that can't be parsed are logged and never queued."""
+        try:
+            url = canonicalize_url(url, self.ignored_params)
+        except ValueError as exc:
+            logging.warning("Skipping %s: %s", url, exc)
+            return False
+        if url in self.visited:
+            return False
+        self.visited.add(url)
+        self.queue.put(url)
+        if len(self.visited) == self.visited.capacity + 1:
+            logging.warning(
+                "More than %d URLs seen, new URLs will increasingly be "
+                "mistaken for visited ones", self.visited.capacity)
+        return True
+
+    def pop(self) -> str:
+        """Return the next URL to crawl, or raise IndexError if there are
+        none."""
+        return self.queue.get()
+
+    def close(self) -> None:
+        self.queue.close()
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+            self,
+            exc_type: Optional[type[BaseException]],
+            exc: Optional[BaseException],
+            traceback: Optional[types.TracebackType]) -> None:
+        self.close()
+
+
+class MemoryReport(NamedTuple):
+    url_count: int
+    set_bytes: int
+    bloom_bytes: int
+
+
+def benchmark_memory(
+        urls: Iterable[str],
+        false_positive_rate: float = 0.01) -> MemoryReport:
+    """Measure how much memory is held to remember urls as visited in a plain
+    set and in a BloomFilter sized for them."""
+    url_list = list(urls)
+
+    # Leave tracing on if the caller was already tracing
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        visited_set: set[str] = set()
+        for url in url_list:
+            visited_set.add(canonicalize_url(url))
+        set_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        del visited_set
+
+        baseline = tracemalloc.get_traced_memory()[0]
+        visited_bloom = BloomFilter(max(1, len(url_list)), false_positive_rate)
+        for url in url_list:
+            visited_bloom.add(canonicalize_url(url))
+        bloom_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return MemoryReport(
+        url_count=len(url_list), set_bytes=set_bytes, bloom_bytes=bloom_bytes)
@@ -13,14 +13,19 @@ import selenium.webdriver.common.by
 import selenium_page_stubber.user.pages.Page
 
 
-def get_driver(site: str) -> selenium.webdriver.chrome.webdriver.WebDriver:
-    """Get a WebDriver pointed at the site, or raise HTTPError."""
+def check_site(site: str) -> None:
+    """Raise HTTPError if GETting the site fails."""
     try:
         resp = requests.get(site)
         resp.raise_for_status()
     except requests.HTTPError:
         logging.error("%d status when GETting %s", resp.status_code, site)
         raise
+
+
+def get_driver(site: str) -> selenium.webdriver.chrome.webdriver.WebDriver:
+    """Get a WebDriver pointed at the site, or raise HTTPError."""
+    check_site(site)
     driver = selenium.webdriver.chrome.webdriver.WebDriver()
     driver.get(site)
     return driver
@@ -0,0 +1,300 @@
+import logging
+from typing import Optional
+
+
+import pytest
+
+
+import selenium_page_stubber.client.cluster
+
+
+shape = selenium_page_stubber.client.cluster.dom_shape_hash
+
+
+@pytest.mark.parametrize("url, expected", (
+    ("https://www.site.com/", "https://www.site.com/"),
+    ("https://www.site.com", "https://www.site.com/"),
+    ("https://www.site.com/product/1", "https://www.site.com/product/{}"),
+    ("https://WWW.Site.com/product/50000",
+        "https://www.site.com/product/{}"),
+    ("https://www.site.com/product/1/reviews",
+        "https://www.site.com/product/{}/reviews"),
+    ("https://www.site.com/order/123e4567-e89b-12d3-a456-426614174000",
+        "https://www.site.com/order/{}"),
+    ("https://www.site.com/commit/9bfd0c4a", "https://www.site.com/commit/{}"),
+    ("https://www.site.com/posts/2.html",
+        "https://www.site.com/posts/{}.html"),
+    ("https://www.site.com/search?q=shoes&page=2#results",
+        "https://www.site.com/search?page={}&q=shoes"),
+    ("https://www.site.com/index.php?page=about",
+        "https://www.site.com/index.php?page=about"),
+    ("https://www.site.com/search?q=red%20shoes",
+        "https://www.site.com/search?q=red%20shoes"),
+    ("https://www.site.com/about", "https://www.site.com/about"),
+))
+def test_url_template(url: str, expected: str) -> None:
+    assert selenium_page_stubber.client.cluster.url_template(url) == expected
+
+
+def test_collapse_templates() -> None:
+    posts = [f"https://www.site.com/blog/post-{name}" for name in "abcdef"]
+    reviews = [f"https://www.site.com/product/{name}/reviews"
+               for name in "abcdef"]
+    fixed = ["https://www.site.com/about", "https://www.site.com/contact"]
+
+    mapping = selenium_page_stubber.client.cluster.collapse_templates(
+        posts + reviews + fixed, max_distinct=5)
+    assert mapping == {
+        **dict.fromkeys(posts, "https://www.site.com/blog/{}"),
+        **dict.fromkeys(reviews, "https://www.site.com/product/{}/reviews"),
+        **{template: template for template in fixed}}
+
+
+def test_collapse_templates_query_values() -> None:
+    searches = [f"https://www.site.com/search?page={{}}&q={name}"
+                for name in "abcdef"]
+    routes = ["https://www.site.com/index.php?page=about",
+              "https://www.site.com/index.php?page=contact"]
+    mapping = selenium_page_stubber.client.cluster.collapse_templates(
+        searches + routes, max_distinct=5)
+    assert mapping == {
+        **dict.fromkeys(searches, "https://www.site.com/search?page={}&q={}"),
+        **{template: template for template in routes}}
+
+
+def test_collapse_templates_repeatedly() -> None:
+    templates = [
+        f"https://www.site.com/blog/{category}/{post}"
+        for category in ("news", "howto", "events")
+        for post in ("one", "two", "three")]
+    mapping = selenium_page_stubber.client.cluster.collapse_templates(
+        templates, max_distinct=2)
+    assert set(mapping.values()) == {"https://www.site.com/blog/{}/{}"}
+
+
+@pytest.mark.parametrize("template, expected", (
+    ("https://www.site.com/", "IndexPage"),
+    ("https://www.site.com/product/{}", "ProductPage"),
+    ("https://www.site.com/product/{}/reviews", "ProductReviewsPage"),
+    ("https://www.site.com/user-profile/{}", "UserProfilePage"),
+    ("https://www.site.com/posts/{}.html", "PostsPage"),
+    ("https://www.site.com/2024/{}", "Page2024Page"),
+    ("https://www.site.com/search?page={}&q={}", "SearchPage"),
+    ("https://www.site.com/index.php?page=about", "IndexAboutPage"),
+    ("https://www.site.com/?page=user%20profile", "UserProfilePage"),
+))
+def test_page_class_name(template: str, expected: str) -> None:
+    assert selenium_page_stubber.client.cluster.page_class_name(
+        template) == expected
+
+
+def test_dom_shape_hash_ignores_content() -> None:
+    first = '<html><body><h1 class="a">Shoe</h1><p>Red</p></body></html>'
+    second = '<html><body><h1 class="b">Hat</h1><p>Blue</p></body></html>'
+    assert shape(first) == shape(second)
+
+
+def test_dom_shape_hash_collapses_repeated_siblings() -> None:
+    item = "<li><a href='#'>item</a><br></li>"
+    first = f"<html><body><ul>{item * 3}</ul></body></html>"
+    second = f"<html><body><ul>{item * 30}</ul></body></html>"
+    assert shape(first) == shape(second)
+
+
+def test_dom_shape_hash_differs_by_structure() -> None:
+    first = "<html><body><h1>Title</h1><p>Text</p></body></html>"
+    second = "<html><body><h1>Title</h1><form><input></form></body></html>"
+    assert shape(first) != shape(second)
+
+
+def test_dom_shape_hash_unbalanced_tags() -> None:
+    closed = "<html><body><p>One</p><p>Two</p></body></html>"
+    unclosed = "<html><body><p>One<p>Two</span></body>"
+    assert shape(closed) == shape(unclosed)
+
+
+@pytest.mark.parametrize("element, count", (
+    ("<li>item", 3),
+    ("<li>item", 4),
+    ("<li>item</li>", 30),
+))
+def test_dom_shape_hash_unclosed_list_items(element: str, count: int) -> None:
+    unclosed = "<ul><li>a<li>b</ul>"
+    assert shape(unclosed) == shape(f"<ul>{element * count}</ul>")
+
+
+@pytest.mark.parametrize("unclosed, closed", (
+    ("<table><tr><td>a<td>b<tr><td>c<td>d</table>",
+        "<table><tr><td>a</td></tr></table>"),
+    ("<table><tr><th>a<td>b</table>",
+        "<table><tr><th>a</th><td>b</td></tr></table>"),
+    ("<table><tr><td>a<th>b</table>",
+        "<table><tr><td>a</td><th>b</th></tr></table>"),
+    ("<dl><dt>a<dd>b</dl>", "<dl><dt>a</dt><dd>b</dd></dl>"),
+    ("<dl><dd>a<dt>b</dl>", "<dl><dd>a</dd><dt>b</dt></dl>"),
+))
+def test_dom_shape_hash_unclosed_table_cells(
+        unclosed: str, closed: str) -> None:
+    assert shape(unclosed) == shape(closed)
+
+
+def test_dom_shape_hash_nested_lists() -> None:
+    nested = "<ul><li>a<ul><li>b<li>c</ul><li>d</ul>"
+    flat = "<ul><li>a<li>b<li>c<li>d</ul>"
+    assert shape(nested) != shape(flat)
+
+
+def test_cluster_pages() -> None:
+    products = [f"https://www.site.com/product/{i}" for i in range(1000)]
+    items = [f"https://www.site.com/item/{i}" for i in range(10)]
+    others = ["https://www.site.com/", "https://www.site.com/about"]
+    shapes = {
+        "https://www.site.com/": "index",
+        "https://www.site.com/about": "about",
+    }
+    loaded = []
+
+    def get_shape(url: str) -> str:
+        loaded.append(url)
+        return shapes.get(url, "product")
+
+    page_types = selenium_page_stubber.client.cluster.cluster_pages(
+        products + items + others, get_shape, samples_per_cluster=2)
+
+    # Only the samples were loaded
+    assert sorted(loaded) == sorted(
+        products[:2] + items[:2] + others)
+    by_name = {page_type.class_name: page_type for page_type in page_types}
+    assert set(by_name) == {"ProductPage", "IndexPage", "AboutPage"}
+
+    # Products and items have the same shape, so they are one page type
+    assert by_name["ProductPage"].templates == [
+        "https://www.site.com/product/{}", "https://www.site.com/item/{}"]
+    assert by_name["ProductPage"].members == products + items
+    assert by_name["ProductPage"].samples == products[:2] + items[:2]
+    assert by_name["ProductPage"].shapes == frozenset({"product"})
+    assert by_name["AboutPage"].members == ["https://www.site.com/about"]
+
+
+def test_cluster_pages_slugs() -> None:
+    posts = [f"https://www.site.com/blog/how-to-{i}-things" for i in range(50)]
+    loaded = []
+
+    def get_shape(url: str) -> str:
+        loaded.append(url)
+        return "about" if url.endswith("/about") else "post"
+
+    page_types = selenium_page_stubber.client.cluster.cluster_pages(
+        posts + ["https://www.site.com/about"], get_shape,
+        samples_per_cluster=2, max_distinct_segments=20)
+    # Posts have the same shape, so they stay collapsed
+    assert loaded == posts[:2] + ["https://www.site.com/about"]
+    assert page_types[0].class_name == "BlogPage"
+    assert page_types[0].templates == ["https://www.site.com/blog/{}"]
+    assert page_types[0].members == posts
+
+
+def test_cluster_pages_splits_by_shape(
+        caplog: pytest.LogCaptureFixture) -> None:
+    products = [f"https://www.site.com/product/{i}" for i in range(5)]
+    shapes = dict(zip(products, "abaaa"))
+
+    with caplog.at_level(logging.WARNING):
+        page_types = selenium_page_stubber.client.cluster.cluster_pages(
+            products, shapes.__getitem__, samples_per_cluster=2)
+
+    # Pages that weren't sampled go with the most common shape
+    assert [(page_type.class_name, page_type.members, page_type.samples,
+             page_type.shapes) for page_type in page_types] == [
+        ("ProductPage", [products[0]] + products[2:], [products[0]],
+            frozenset({"a"})),
+        ("Product2Page", [products[1]], [products[1]], frozenset({"b"})),
+    ]
+    assert caplog.record_tuples == [(
+        "root", logging.WARNING,
+        "Samples of https://www.site.com/product/{} have 2 different "
+        "shapes, splitting them")]
+
+
+def test_cluster_pages_fixed_pages_not_collapsed() -> None:
+    names = ["about", "contact", "faq", "pricing"] + [
+        f"page{letter}" for letter in "abcdefghijklmnopq"]
+    pages = [f"https://www.site.com/{name}" for name in names]
+    loaded = []
+
+    def get_shape(url: str) -> str:
+        loaded.append(url)
+        return url
+
+    page_types = selenium_page_stubber.client.cluster.cluster_pages(
+        ["https://www.site.com/"] + pages, get_shape, samples_per_cluster=3,
+        max_distinct_segments=20)
+
+    # The pages would be collapsed by template, but their shapes differ
+    assert len(page_types) == len(pages) + 1
+    assert page_types[0].class_name == "IndexPage"
+    assert [page_type.members for page_type in page_types[1:]] == [
+        [page] for page in pages]
+    # Each page was only loaded once
+    assert sorted(loaded) == sorted(["https://www.site.com/"] + pages)
+
+
+def test_cluster_pages_query_routes() -> None:
+    pages = [f"https://www.site.com/index.php?page={name}"
+             for name in ("about", "contact", "cart")]
+    page_types = selenium_page_stubber.client.cluster.cluster_pages(
+        pages, lambda url: url, samples_per_cluster=1)
+    assert [page_type.class_name for page_type in page_types] == [
+        "IndexAboutPage", "IndexContactPage", "IndexCartPage"]
+
+
+def test_cluster_pages_query_values_collapsed() -> None:
+    searches = [f"https://www.site.com/search?q=term-{i}" for i in range(30)]
+    page_types = selenium_page_stubber.client.cluster.cluster_pages(
+        searches, lambda url: "results", samples_per_cluster=2)
+    assert [(page_type.class_name, page_type.templates, page_type.members)
+            for page_type in page_types] == [
+        ("SearchPage", ["https://www.site.com/search?q={}"], searches)]
+
+
+def test_cluster_pages_failed_samples(
+        caplog: pytest.LogCaptureFixture) -> None:
+    products = [f"https://www.site.com/product/{i}" for i in range(5)]
+    items = [f"https://www.site.com/item/{i}" for i in range(5)]
+    loaded = []
+
+    def get_shape(url: str) -> Optional[str]:
+        loaded.append(url)
+        if url == products[0] or url in items:
+            return None
+        return "product"
+
+    with caplog.at_level(logging.WARNING):
+        page_types = selenium_page_stubber.client.cluster.cluster_pages(
+            products + items, get_shape, samples_per_cluster=2)
+
+    # Failed samples were replaced with other members, up to
+    # samples_per_cluster failures
+    assert loaded == products[:3] + items[:2]
+    assert [(page_type.class_name, page_type.members, page_type.samples,
+             page_type.shapes) for page_type in page_types] == [
+        ("ProductPage", products, products[1:3], frozenset({"product"})),
+        ("ItemPage", items, [], frozenset()),
+    ]
+    assert caplog.record_tuples == [(
+        "root", logging.WARNING,
+        "No samples of https://www.site.com/item/{} could be loaded")]
+
+
+def test_cluster_pages_unique_class_names() -> None:
+    urls = ["https://www.site.com/a-b", "https://www.site.com/a/b"]
+    page_types = selenium_page_stubber.client.cluster.cluster_pages(
+        urls, lambda url: url)
+    assert [page_type.class_name for page_type in page_types] == [
+        "ABPage", "AB2Page"]
+
+
+def test_cluster_pages_bad_samples() -> None:
+    with pytest.raises(ValueError):
+        selenium_page_stubber.client.cluster.cluster_pages(
+            [], lambda url: url, samples_per_cluster=0)
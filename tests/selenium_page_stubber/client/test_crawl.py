@@ -0,0 +1,207 @@
+import logging
+import pathlib
+import tracemalloc
+import urllib.parse
+
+
+import pytest
+
+
+import selenium_page_stubber.client.crawl
+
+
+@pytest.mark.parametrize("url, expected", (
+    ("HTTP://WWW.Site.COM/", "http://www.site.com/"),
+    ("https://www.site.com", "https://www.site.com/"),
+    ("https://www.site.com:443/a", "https://www.site.com/a"),
+    ("http://www.site.com:8080/a", "http://www.site.com:8080/a"),
+    ("http://[::1]:8080/a", "http://[::1]:8080/a"),
+    ("http://[::1]:80/a", "http://[::1]/a"),
+    ("https://www.site.com/a#section", "https://www.site.com/a"),
+    ("https://www.site.com/a?b=2&a=1", "https://www.site.com/a?a=1&b=2"),
+    ("https://www.site.com/%7Euser", "https://www.site.com/~user"),
+    ("https://www.site.com/files/a%2fb", "https://www.site.com/files/a%2Fb"),
+    ("https://www.site.com/a%3Fb%25", "https://www.site.com/a%3Fb%25"),
+    ("https://www.site.com/a b", "https://www.site.com/a%20b"),
+    ("https://www.site.com/a?b=", "https://www.site.com/a?b="),
+    ("https://www.site.com/a?edit", "https://www.site.com/a?edit"),
+    ("https://www.site.com/a?edit&b=1&&a",
+        "https://www.site.com/a?a&b=1&edit"),
+    ("https://www.site.com/a?q=%7e+x%2F",
+        "https://www.site.com/a?q=~+x%2F"),
+    ("https://www.site.com/a/../b", "https://www.site.com/b"),
+    ("https://www.site.com/a/./b/../c", "https://www.site.com/a/c"),
+    ("https://www.site.com/a/b/..", "https://www.site.com/a/"),
+    ("https://www.site.com/a/.", "https://www.site.com/a/"),
+    ("https://www.site.com/../a", "https://www.site.com/a"),
+    ("https://www.site.com/a/%2E%2E/b", "https://www.site.com/b"),
+))
+def test_canonicalize_url(url: str, expected: str) -> None:
+    assert selenium_page_stubber.client.crawl.canonicalize_url(url) == expected
+
+
+def test_canonicalize_url_ipv6_round_trips() -> None:
+    url = selenium_page_stubber.client.crawl.canonicalize_url(
+        "http://[::1]:8080/a")
+    assert urllib.parse.urlsplit(url).port == 8080
+    assert selenium_page_stubber.client.crawl.canonicalize_url(url) == url
+
+
+@pytest.mark.parametrize("url", (
+    "http://www.site.com:abc/",
+    "http://[::1/",
+))
+def test_canonicalize_url_malformed(url: str) -> None:
+    with pytest.raises(ValueError):
+        selenium_page_stubber.client.crawl.canonicalize_url(url)
+
+
+def test_frontier_malformed_url(caplog: pytest.LogCaptureFixture) -> None:
+    with (selenium_page_stubber.client.crawl.Frontier(100) as frontier,
+            caplog.at_level(logging.WARNING)):
+        assert not frontier.add("http://www.site.com:abc/")
+        assert frontier.add("http://www.site.com/")
+        assert len(frontier) == 1
+    assert [record for record in caplog.record_tuples if record[:2] == (
+        "root", logging.WARNING)]
+
+
+def test_frontier_escaped_slash() -> None:
+    with selenium_page_stubber.client.crawl.Frontier(100) as frontier:
+        assert frontier.add("https://www.site.com/files/a%2Fb")
+        assert frontier.add("https://www.site.com/files/a/b")
+
+
+def test_canonicalize_url_ignored_params() -> None:
+    url = "https://www.site.com/a?utm_source=mail&id=1"
+    assert selenium_page_stubber.client.crawl.canonicalize_url(
+        url, frozenset({"utm_source"})) == "https://www.site.com/a?id=1"
+
+
+def test_bloom_filter_no_false_negatives() -> None:
+    bloom = selenium_page_stubber.client.crawl.BloomFilter(1000)
+    urls = [f"https://www.site.com/product/{i}" for i in range(1000)]
+    for url in urls:
+        bloom.add(url)
+    assert all(url in bloom for url in urls)
+    # False positives aren't counted as new items
+    assert len(urls) * 0.98 < len(bloom) <= len(urls)
+
+
+def test_bloom_filter_len_ignores_duplicates() -> None:
+    bloom = selenium_page_stubber.client.crawl.BloomFilter(100)
+    bloom.add("a")
+    bloom.add("a")
+    assert len(bloom) == 1
+
+
+def test_bloom_filter_false_positive_rate() -> None:
+    capacity = 10000
+    false_positive_rate = 0.01
+    bloom = selenium_page_stubber.client.crawl.BloomFilter(
+        capacity, false_positive_rate)
+    for i in range(capacity):
+        bloom.add(f"https://www.site.com/product/{i}")
+    false_positives = sum(
+        f"https://www.site.com/other/{i}" in bloom for i in range(capacity))
+    # Allow some slack, the rate is only expected on average
+    assert false_positives / capacity < false_positive_rate * 2
+
+
+@pytest.mark.parametrize("capacity, false_positive_rate", (
+    (0, 0.01),
+    (100, 0),
+    (100, 1),
+))
+def test_bloom_filter_bad_arguments(
+        capacity: int, false_positive_rate: float) -> None:
+    with pytest.raises(ValueError):
+        selenium_page_stubber.client.crawl.BloomFilter(
+            capacity, false_positive_rate)
+
+
+def test_disk_queue(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "queue"
+    with selenium_page_stubber.client.crawl.DiskQueue(path) as queue:
+        queue.put("first")
+        queue.put("second")
+        assert len(queue) == 2
+        assert queue.get() == "first"
+        queue.put("third")
+        assert queue.get() == "second"
+        queue._file.flush()
+        assert path.read_text() == "first\nsecond\nthird\n"
+        assert queue.get() == "third"
+        assert len(queue) == 0
+        with pytest.raises(IndexError):
+            queue.get()
+        # The file is truncated once the queue is empty
+        assert path.read_text() == ""
+        queue.put("fourth")
+        assert queue.get() == "fourth"
+
+
+def test_disk_queue_truncates_existing_file(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "queue"
+    path.write_text("stale\n")
+    with selenium_page_stubber.client.crawl.DiskQueue(path) as queue:
+        assert len(queue) == 0
+        queue.put("first")
+        assert queue.get() == "first"
+
+
+def test_disk_queue_newline() -> None:
+    with selenium_page_stubber.client.crawl.DiskQueue() as queue:
+        with pytest.raises(ValueError):
+            queue.put("first\nsecond")
+
+
+def test_frontier() -> None:
+    with selenium_page_stubber.client.crawl.Frontier(100) as frontier:
+        assert frontier.add("https://www.site.com/a?b=2&a=1")
+        assert not frontier.add("HTTPS://www.site.com/a?a=1&b=2#top")
+        assert frontier.add("https://www.site.com/b")
+        assert len(frontier) == 2
+        assert frontier.pop() == "https://www.site.com/a?a=1&b=2"
+        assert frontier.pop() == "https://www.site.com/b"
+        # Popped URLs are still remembered as visited
+        assert not frontier.add("https://www.site.com/a?a=1&b=2")
+        with pytest.raises(IndexError):
+            frontier.pop()
+
+
+def test_frontier_over_capacity(caplog: pytest.LogCaptureFixture) -> None:
+    capacity = 10
+    message = (
+        f"More than {capacity} URLs seen, new URLs will increasingly be "
+        "mistaken for visited ones")
+    with (selenium_page_stubber.client.crawl.Frontier(capacity) as frontier,
+            caplog.at_level(logging.WARNING)):
+        for i in range(capacity):
+            frontier.add(f"https://www.site.com/product/{i}")
+        assert not caplog.record_tuples
+
+        for i in range(capacity, capacity * 10):
+            frontier.add(f"https://www.site.com/product/{i}")
+    # The warning is only logged once
+    assert caplog.record_tuples == [("root", logging.WARNING, message)]
+
+
+def test_benchmark_memory() -> None:
+    urls = [f"https://www.site.com/product/{i}?page={i % 10}"
+            for i in range(10000)]
+    report = selenium_page_stubber.client.crawl.benchmark_memory(urls)
+    assert report.url_count == len(urls)
+    assert report.bloom_bytes < report.set_bytes
+    assert not tracemalloc.is_tracing()
+
+
+def test_benchmark_memory_already_tracing() -> None:
+    urls = [f"https://www.site.com/product/{i}" for i in range(1000)]
+    tracemalloc.start()
+    try:
+        report = selenium_page_stubber.client.crawl.benchmark_memory(urls)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert report.bloom_bytes < report.set_bytes
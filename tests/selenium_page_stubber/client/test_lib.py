@@ -25,6 +25,14 @@ def test_get_driver_success(
     assert driver == mock_driver
 
 
+@unittest.mock.patch("requests.get")
+def test_check_site_success(mock_requests: unittest.mock.MagicMock) -> None:
+    url = "http://www.somesite.com"
+    selenium_page_stubber.client.lib.check_site(url)
+    mock_requests.assert_called_once_with(url)
+    mock_requests.return_value.raise_for_status.assert_called_once_with()
+
+
 def test_get_driver_bad_url(caplog: pytest.LogCaptureFixture) -> None:
     url = "http://www.somesite.com"
     resp = requests.Response()
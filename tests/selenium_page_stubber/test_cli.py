@@ -1,3 +1,4 @@
+import logging
 import os
 import pathlib
 import unittest.mock
@@ -6,6 +7,7 @@ import unittest.mock
 import click.globals
 import click.testing
 import pytest
+import requests
 
 
 import selenium_page_stubber.cli
@@ -43,6 +45,129 @@ def test_main(
         url=site)
 
 
+@unittest.mock.patch("selenium_page_stubber.client.lib.get_page_class")
+@unittest.mock.patch("selenium_page_stubber.client.lib.check_site")
+@unittest.mock.patch("selenium_page_stubber.client.lib.get_driver")
+def test_main_page_types(
+        mock_get_driver: unittest.mock.MagicMock,
+        mock_check_site: unittest.mock.MagicMock,
+        mock_get_page_class: unittest.mock.MagicMock) -> None:
+    products = [f"https://www.site.com/product/{i}" for i in range(10)]
+    sites = products + ["https://www.site.com/about"]
+    page_directory = pathlib.Path("page_directory")
+    template_directory = pathlib.Path("template_directory")
+    template_name = "template_name"
+    driver = mock_get_driver.return_value
+    driver.page_source = "<html></html>"
+
+    page_classes = selenium_page_stubber.cli.main_page_types(
+        sites=sites,
+        page_directory=page_directory,
+        template_directory=template_directory,
+        template_name=template_name,
+        samples_per_cluster=2)
+
+    # One browser was started for the first sample, and reused for the
+    # rest, and to stub the page
+    mock_get_driver.assert_called_once_with(products[0])
+    assert mock_check_site.call_args_list == [
+        unittest.mock.call(site) for site in (products[1], sites[-1])]
+    assert driver.get.call_args_list == [
+        unittest.mock.call(site)
+        for site in (products[1], sites[-1], products[0])]
+    driver.quit.assert_called_once_with()
+    # Products and about have the same shape, so they are one page type
+    mock_get_page_class.assert_called_once_with(
+        page_directory=page_directory,
+        page_module="ProductPage",
+        page_class="ProductPage",
+        template_directory=template_directory,
+        template_name=template_name)
+    assert page_classes == dict.fromkeys(
+        sites, mock_get_page_class.return_value)
+    mock_get_page_class.return_value.assert_called_once_with(
+        driver=driver, url=products[0])
+
+
+@pytest.mark.parametrize("error", (
+    requests.HTTPError(), requests.ConnectionError()))
+@unittest.mock.patch("selenium_page_stubber.client.lib.get_page_class")
+@unittest.mock.patch("selenium_page_stubber.client.lib.check_site")
+@unittest.mock.patch("selenium_page_stubber.client.lib.get_driver")
+def test_main_page_types_skips_failed_samples(
+        mock_get_driver: unittest.mock.MagicMock,
+        mock_check_site: unittest.mock.MagicMock,
+        mock_get_page_class: unittest.mock.MagicMock,
+        error: requests.RequestException,
+        caplog: pytest.LogCaptureFixture) -> None:
+    products = [f"https://www.site.com/product/{i}" for i in range(4)]
+    driver = unittest.mock.MagicMock(page_source="<html></html>")
+    mock_get_driver.side_effect = [error, driver]
+    mock_check_site.side_effect = [error, None]
+
+    with caplog.at_level(logging.ERROR):
+        page_classes = selenium_page_stubber.cli.main_page_types(
+            sites=products,
+            page_directory=pathlib.Path("page_directory"),
+            template_directory=pathlib.Path("template_directory"),
+            template_name="template_name",
+            samples_per_cluster=3)
+
+    # products[0] couldn't start the browser, and products[2] couldn't be
+    # loaded in it, so they were skipped
+    assert mock_get_driver.call_args_list == [
+        unittest.mock.call(site) for site in products[:2]]
+    assert mock_check_site.call_args_list == [
+        unittest.mock.call(site) for site in products[2:]]
+    assert [message for _, level, message in caplog.record_tuples
+            if level == logging.ERROR] == [
+        f"Skipping {site}: {error}" for site in (products[0], products[2])]
+    mock_get_page_class.return_value.assert_called_once_with(
+        driver=driver, url=products[1])
+    assert page_classes == dict.fromkeys(
+        products, mock_get_page_class.return_value)
+    driver.quit.assert_called_once_with()
+
+
+@unittest.mock.patch(
+    "selenium_page_stubber.client.lib.get_page_class",
+    side_effect=Exception("Error"))
+@unittest.mock.patch("selenium_page_stubber.client.lib.get_driver")
+def test_main_page_types_quits_on_error(
+        mock_get_driver: unittest.mock.MagicMock,
+        mock_get_page_class: unittest.mock.MagicMock) -> None:
+    mock_get_driver.return_value.page_source = "<html></html>"
+
+    with pytest.raises(Exception):
+        selenium_page_stubber.cli.main_page_types(
+            sites=["https://www.site.com/product/1"],
+            page_directory=pathlib.Path("page_directory"),
+            template_directory=pathlib.Path("template_directory"),
+            template_name="template_name")
+    mock_get_driver.return_value.quit.assert_called_once_with()
+
+
+@unittest.mock.patch("selenium_page_stubber.cli.check_permissions")
+@unittest.mock.patch("selenium_page_stubber.cli.main_page_types")
+@unittest.mock.patch("selenium_page_stubber.cli.main")
+def test_cli_several_sites(
+        mock_main: unittest.mock.MagicMock,
+        mock_main_page_types: unittest.mock.MagicMock,
+        mock_check_permissions: unittest.mock.MagicMock) -> None:
+    sites = ["https://www.site.com/product/1", "https://www.site.com/about"]
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        selenium_page_stubber.cli.cli, ["--samples", "5"] + sites)
+    assert result.exit_code == 0
+    mock_main.assert_not_called()
+    mock_main_page_types.assert_called_once_with(
+        tuple(sites),
+        pathlib.Path("pages"),
+        pathlib.Path("templates"),
+        "Page.jinja",
+        5)
+
+
 @pytest.mark.parametrize("set_flag", (True, False))
 @unittest.mock.patch(
     "selenium_page_stubber.client.lib.initialize",